@@ -93,7 +93,7 @@ def extract_desis(ds, lat, lon):
 
     x, y = convert_coords([[lat, lon]], "epsg:4326", crs)[0]
 
-    values = ds.sel(x=x, y=y, method="nearest")["reflectance"].values / 10000
+    values = ds["reflectance"].sel(x=x, y=y, method="nearest").values / 10000
 
     da = xr.DataArray(
         values, dims=["wavelength"], coords={"wavelength": ds.coords["wavelength"]}
@@ -139,12 +139,12 @@ def filter_desis(dataset, lat, lon, return_plot=False, **kwargs):
 
     if len(coords) == 1:
         x, y = coords[0]
-        da = dataset.sel(x=x, y=y, method="nearest")["reflectance"]
+        da = dataset["reflectance"].sel(x=x, y=y, method="nearest")
     else:
         x_min, y_min = coords[0]
         x_max, y_max = coords[1]
         print(x_min, y_min, x_max, y_max)
-        da = dataset.sel(x=slice(x_min, x_max), y=slice(y_min, y_max))["reflectance"]
+        da = dataset["reflectance"].sel(x=slice(x_min, x_max), y=slice(y_min, y_max))
 
     if return_plot:
         rrs_stack = da.stack(
@@ -667,24 +667,112 @@ class Map(leafmap.Map):
     def spectral_to_df(self, **kwargs):
         """Converts the spectral data to a pandas DataFrame.
 
+        The spectra are stored as float16, so each value is converted through
+        its shortest decimal form (e.g. 0.7324 rather than 0.7324219), keeping
+        only the precision that is actually stored.
+
         Returns:
             pd.DataFrame: The spectral data as a pandas DataFrame.
         """
         import pandas as pd
 
-        df = pd.DataFrame(self._spectral_data, **kwargs)
+        if getattr(self, "_spectra", None) is None:
+            return pd.DataFrame(**kwargs)
+
+        count = self._spectra_count
+        columns = [
+            f"({lat:.4f} {lon:.4f})" for lat, lon in self._spectra_coords[:count]
+        ]
+        spectra = self._spectra[:count].T.astype(str).astype(np.float64)
+        df = pd.DataFrame(spectra, columns=columns, **kwargs)
+        df.insert(0, "wavelength", self._spectral_wavelengths)
         return df
 
     def spectral_to_csv(self, filename, index=True, **kwargs):
         """Saves the spectral data to a CSV file.
 
+        The file is written one band at a time from the stored spectra, without
+        building a DataFrame of all the spectra first.
+
+        The spectra are stored as float16, which keeps about three significant
+        digits, and are written with that precision. Values below about 6e-5,
+        such as small PACE remote sensing reflectances, lose further precision.
+
         Args:
             filename (str): The output CSV file.
             index (bool, optional): Whether to write the index. Defaults to True.
+            **kwargs: Additional format parameters passed to csv.writer.
+        """
+        import csv
+
+        kwargs.setdefault("lineterminator", "\n")
+        with open(filename, "w", newline="") as f:
+            writer = csv.writer(f, **kwargs)
+            if getattr(self, "_spectra", None) is None:
+                writer.writerow(["band"] if index else [])
+                return
+
+            count = self._spectra_count
+            header = ["wavelength"] + [
+                f"({lat:.4f} {lon:.4f})" for lat, lon in self._spectra_coords[:count]
+            ]
+            if index:
+                header.insert(0, "band")
+            writer.writerow(header)
+
+            spectra = self._spectra[:count].T
+            for band, (wavelength, values) in enumerate(
+                zip(self._spectral_wavelengths, spectra)
+            ):
+                row = np.where(np.isnan(values), "", values.astype(str))
+                row = [wavelength] + row.tolist()
+                if index:
+                    row.insert(0, band)
+                writer.writerow(row)
+
+    def _clear_spectral_data(self):
+        """Removes all the spectra collected by the spectral widget."""
+        self._spectral_wavelengths = None
+        self._spectra = None
+        self._spectra_coords = None
+        self._spectra_count = 0
+
+    def _add_spectral_data(self, lat, lon, values, wavelengths):
+        """Appends a spectrum to the spectral data.
+
+        The spectra are stored as float16 rows of a preallocated 2D array, with
+        the coordinates in a parallel array. The capacity is doubled when full.
+        Reflectance needs about three significant digits, which float16 keeps
+        at a quarter of the memory of float64.
+
+        Args:
+            lat (float): The latitude of the spectrum.
+            lon (float): The longitude of the spectrum.
+            values (np.ndarray): The spectrum values.
+            wavelengths (np.ndarray): The wavelengths of the spectrum.
         """
-        df = self.spectral_to_df()
-        df = df.rename_axis("band")
-        df.to_csv(filename, index=index, **kwargs)
+        if self._spectra is None:
+            self._spectral_wavelengths = np.asarray(wavelengths)
+            self._spectra = np.empty((16, len(values)), dtype=np.float16)
+            self._spectra_coords = np.empty((16, 2))
+        elif len(values) != self._spectra.shape[1]:
+            raise ValueError(
+                f"The spectrum has {len(values)} bands, but the existing spectral "
+                f"data has {self._spectra.shape[1]} bands. Remove all markers first."
+            )
+
+        count = self._spectra_count
+        if count == len(self._spectra):
+            self._spectra = np.concatenate(
+                [self._spectra, np.empty_like(self._spectra)]
+            )
+            self._spectra_coords = np.concatenate(
+                [self._spectra_coords, np.empty_like(self._spectra_coords)]
+            )
+
+        self._spectra[count] = values
+        self._spectra_coords[count] = (lat, lon)
+        self._spectra_count = count + 1
 
     def _update_band_names(self, layer_name, wavelengths):
 
@@ -189,7 +189,7 @@ def extract_neon(ds, lat, lon):
 
     x, y = convert_coords([[lat, lon]], "epsg:4326", crs)[0]
 
-    values = ds.sel(x=x, y=y, method="nearest")["reflectance"].values
+    values = ds["reflectance"].sel(x=x, y=y, method="nearest").values
 
     da = xr.DataArray(
         values, dims=["wavelength"], coords={"wavelength": ds.coords["wavelength"]}
@@ -1,21 +1,176 @@
 """This module contains the user interface for the hypercoast package.
 """
 
+import asyncio
+import functools
 import os
+import threading
+import traceback
+from concurrent.futures import ThreadPoolExecutor
 import ipyleaflet
 import bqplot
 import ipywidgets as widgets
 import numpy as np
 import xarray as xr
-from bqplot import pyplot as plt
 from IPython.core.display import display
 from ipyfilechooser import FileChooser
-from .pace import extract_pace
 from .desis import extract_desis
 from .neon import extract_neon
 from .aviris import extract_aviris
 
 
+def _latlon_to_xyz(lat, lon):
+    """
+    Converts latitude/longitude in degrees to unit vectors on the sphere.
+
+    The chord distance between two unit vectors ranks neighbors the same way as
+    the haversine distance, so the vectors can be indexed by a k-d tree.
+
+    Args:
+        lat (array-like): The latitudes in degrees.
+        lon (array-like): The longitudes in degrees.
+
+    Returns:
+        np.ndarray: An array of shape (n, 3) with the unit vectors.
+    """
+    lat = np.deg2rad(np.asarray(lat, dtype=np.float64).ravel())
+    lon = np.deg2rad(np.asarray(lon, dtype=np.float64).ravel())
+    return np.column_stack(
+        [np.cos(lat) * np.cos(lon), np.cos(lat) * np.sin(lon), np.sin(lat)]
+    )
+
+
+def _build_latlon_tree(ds):
+    """
+    Builds a nearest-neighbor index over the latitude/longitude grid of a dataset.
+
+    Both rectilinear grids with 1D latitude/longitude coordinates, such as EMIT
+    data with non-monotonic coordinates, and curvilinear grids with 2D
+    latitude/longitude coordinates, such as PACE swaths, are supported.
+
+    Args:
+        ds (xarray.Dataset): The dataset with latitude and longitude coordinates.
+
+    Returns:
+        tuple: The k-d tree, the dimension names and the latitude and longitude
+            grids, with one point of the tree per grid cell.
+    """
+    from scipy.spatial import cKDTree
+
+    lat = ds["latitude"]
+    lon = ds["longitude"]
+    if lat.ndim == 1:
+        dims = (lat.dims[0], lon.dims[0])
+        lon_grid, lat_grid = np.meshgrid(lon.values, lat.values)
+    else:
+        dims = lat.dims
+        lat_grid = lat.values
+        lon_grid = lon.transpose(*dims).values
+
+    # Cells without a location are moved to the center of the sphere, at a
+    # chord distance of 1 from every location, so they are never near a click.
+    xyz = np.nan_to_num(_latlon_to_xyz(lat_grid, lon_grid), nan=0.0)
+    tree = cKDTree(xyz)
+    return tree, dims, lat_grid, lon_grid
+
+
+def _build_latlon_axes(ds):
+    """
+    Extracts the latitude/longitude axes of a rectilinear grid for nearest lookups.
+
+    Args:
+        ds (xarray.Dataset): The dataset with latitude and longitude coordinates.
+
+    Returns:
+        list: A (axis, descending) pair for latitude and for longitude, where
+            axis is a float32 array sorted in ascending order. None if the
+            coordinates are not monotonic 1D arrays.
+    """
+    axes = []
+    for name in ["latitude", "longitude"]:
+        coord = ds[name]
+        if coord.ndim != 1:
+            return None
+
+        values = coord.values.astype(np.float32)
+        diff = np.diff(values)
+        if np.all(diff > 0):
+            axes.append((values, False))
+        elif np.all(diff < 0):
+            axes.append((np.ascontiguousarray(values[::-1]), True))
+        else:
+            return None
+
+    return axes
+
+
+def _nearest_index(axis, value, descending=False):
+    """
+    Finds the index of the value nearest to a given value in a sorted axis.
+
+    Args:
+        axis (np.ndarray): The axis values, sorted in ascending order.
+        value (float): The value to look up.
+        descending (bool, optional): Whether the original axis is in descending
+            order, in which case the index is mapped back to it. Defaults to False.
+
+    Returns:
+        int: The index of the nearest value.
+    """
+    if len(axis) == 1:
+        return 0
+    i = int(np.searchsorted(axis, value).clip(1, len(axis) - 1))
+    i -= bool(axis[i] - value > value - axis[i - 1])
+    if descending:
+        i = len(axis) - 1 - i
+    return i
+
+
+def _build_pixel_reader(da, dims, maxsize=4):
+    """
+    Builds a function that reads the spectrum of a pixel from a DataArray.
+
+    For dask-backed arrays, the pixel is read from the dask chunk that contains
+    it. The chunk is loaded once and kept in an LRU cache, so clicks on nearby
+    pixels do not read the same chunk again.
+
+    Args:
+        da (xarray.DataArray): The reflectance data.
+        dims (tuple): The names of the row and column dimensions.
+        maxsize (int, optional): The maximum number of cached chunks.
+            Defaults to 4.
+
+    Returns:
+        function: A function that takes the row and column indices of a pixel
+            and returns its spectrum as a DataArray.
+    """
+    y_dim, x_dim = dims
+
+    if da.chunks is None:
+        return lambda i, j: da.isel({y_dim: i, x_dim: j})
+
+    y_bounds = np.cumsum((0,) + da.chunksizes[y_dim])
+    x_bounds = np.cumsum((0,) + da.chunksizes[x_dim])
+
+    @functools.lru_cache(maxsize=maxsize)
+    def load_chunk(ci, cj):
+        return da.isel(
+            {
+                y_dim: slice(y_bounds[ci], y_bounds[ci + 1]),
+                x_dim: slice(x_bounds[cj], x_bounds[cj + 1]),
+            }
+        ).load()
+
+    def read_pixel(i, j):
+        ci = int(np.searchsorted(y_bounds, i, side="right")) - 1
+        cj = int(np.searchsorted(x_bounds, j, side="right")) - 1
+        chunk = load_chunk(ci, cj)
+        return chunk.isel({y_dim: i - y_bounds[ci], x_dim: j - x_bounds[cj]})
+
+    read_pixel.cache_clear = load_chunk.cache_clear
+    return read_pixel
+
+
 class SpectralWidget(widgets.HBox):
     """
     A widget for spectral data visualization on a map.
@@ -28,6 +183,8 @@ class SpectralWidget(widgets.HBox):
         _on_map_interaction (function): Function to handle map interactions.
         _spectral_widget (SpectralWidget): The spectral widget itself.
         _spectral_control (ipyleaflet.WidgetControl): The control for the spectral widget.
+        _active_click_fn (function): Function to extract the spectrum of the selected layer.
+        _layer_cache (dict): The lookup structures built for each layer.
     """
 
     def __init__(self, host_map, stack=True, position="topright"):
@@ -42,20 +199,63 @@ class SpectralWidget(widgets.HBox):
         self.on_close = None
         self._stack = stack
         self._show_plot = False
-
+        self._click_id = 0
+        self._click_delay = 0.2
+        self._click_timer = None
+        self._closed = False
+        # Incremented on reset and close, so pending spectra can be discarded.
+        self._generation = 0
+        self._futures = set()
+        self._lock = threading.Lock()
+        # A single worker keeps the spectra in the order of the clicks.
+        self._executor = ThreadPoolExecutor(max_workers=1)
+        self._file_chooser = None
+        self._file_chooser_control = None
+        self._layer_cache = {}
+
+        if not hasattr(host_map, "_plot_marker_cluster"):
+            host_map._plot_marker_cluster = ipyleaflet.MarkerCluster(
+                name="Marker Cluster"
+            )
+        host_map._plot_markers = getattr(host_map, "_plot_markers", [])
+        if not hasattr(host_map, "_spectra"):
+            host_map._clear_spectral_data()
+
+        # The x scale domain is fixed to the wavelength range of the selected
+        # layer; the y scale is auto-ranged since the reflectance units differ
+        # between sensors (e.g., PACE Rrs vs. surface reflectance).
+        x_scale = bqplot.LinearScale(allow_padding=False)
+        y_scale = bqplot.LinearScale(allow_padding=False)
+        lines = bqplot.Lines(x=[], y=[], scales={"x": x_scale, "y": y_scale})
+        x_axis = bqplot.Axis(
+            scale=x_scale, label="Wavelength (nm)", label_offset="30px"
+        )
+        y_axis = bqplot.Axis(
+            scale=y_scale,
+            orientation="vertical",
+            side="left",
+            label="Reflectance",
+            label_offset="35px",
+        )
         fig_margin = {"top": 20, "bottom": 35, "left": 50, "right": 20}
-        fig = plt.figure(
-            # title=None,
+        fig = bqplot.Figure(
+            marks=[lines],
+            axes=[x_axis, y_axis],
             fig_margin=fig_margin,
             layout={"width": "500px", "height": "300px"},
         )
 
         self._fig = fig
+        self._lines = lines
+        self._x_scale = x_scale
+        self._line_color = lines.colors[0]
         self._host_map._fig = fig
 
         layer_names = list(host_map.cog_layer_dict.keys())
         layers_widget = widgets.Dropdown(options=layer_names)
         layers_widget.layout.width = "18ex"
+        layers_widget.observe(self._on_layer_change, names="value")
+        self._on_layer_change({"new": layers_widget.value})
 
         close_btn = widgets.Button(
             icon="times",
@@ -94,16 +294,16 @@ class SpectralWidget(widgets.HBox):
         settings_btn.on_click(settings_btn_click)
 
         def reset_btn_click(_):
-            if hasattr(self._host_map, "_plot_marker_cluster"):
-                self._host_map._plot_marker_cluster.markers = []
-                self._host_map._plot_markers = []
-
-            if hasattr(self._host_map, "_spectral_data"):
-                self._host_map._spectral_data = {}
-
             self._output_widget.clear_output()
             self._show_plot = False
-            plt.clear()
+            with self._lock:
+                self._generation += 1
+                self._host_map._plot_marker_cluster.markers = []
+                self._host_map._plot_markers = []
+                self._host_map._clear_spectral_data()
+                with self._lines.hold_sync():
+                    self._lines.x = []
+                    self._lines.y = []
 
         reset_btn.on_click(reset_btn_click)
 
@@ -114,39 +314,46 @@ class SpectralWidget(widgets.HBox):
             layout=widgets.Layout(width="32px"),
         )
 
+        def remove_file_chooser():
+            if self._file_chooser_control is not None:
+                if self._file_chooser_control in self._host_map.controls:
+                    self._host_map.remove_control(self._file_chooser_control)
+                self._file_chooser_control.close()
+                self._file_chooser_control = None
+
         def chooser_callback(chooser):
             if chooser.selected:
                 file_path = chooser.selected
                 self._host_map.spectral_to_csv(file_path)
-                if (
-                    hasattr(self._host_map, "_file_chooser_control")
-                    and self._host_map._file_chooser_control in self._host_map.controls
-                ):
-                    self._host_map.remove_control(self._host_map._file_chooser_control)
-                    self._host_map._file_chooser.close()
+                remove_file_chooser()
 
         def save_btn_click(_):
-            if not hasattr(self._host_map, "_spectral_data"):
-                return
-
             self._output_widget.clear_output()
-            file_chooser = FileChooser(
-                os.getcwd(), layout=widgets.Layout(width="454px")
-            )
-            file_chooser.filter_pattern = "*.csv"
-            file_chooser.use_dir_icons = True
-            file_chooser.title = "Save spectral data to a CSV file"
-            file_chooser.default_filename = "spectral_data.csv"
-            file_chooser.show_hidden = False
-            file_chooser.register_callback(chooser_callback)
-            file_chooser_control = ipyleaflet.WidgetControl(
-                widget=file_chooser, position="topright"
-            )
-            self._host_map.add(file_chooser_control)
-            setattr(self._host_map, "_file_chooser", file_chooser)
-            setattr(self._host_map, "_file_chooser_control", file_chooser_control)
+            self._show_plot = False
+            # The file chooser is built once and reused across saves; only the
+            # lightweight control hosting it is recreated.
+            if self._file_chooser is None:
+                file_chooser = FileChooser(
+                    os.getcwd(), layout=widgets.Layout(width="454px")
+                )
+                file_chooser.filter_pattern = "*.csv"
+                file_chooser.use_dir_icons = True
+                file_chooser.title = "Save spectral data to a CSV file"
+                file_chooser.default_filename = "spectral_data.csv"
+                file_chooser.show_hidden = False
+                file_chooser.register_callback(chooser_callback)
+                self._file_chooser = file_chooser
+            else:
+                self._file_chooser.reset(path=os.getcwd())
+
+            if self._file_chooser_control is None:
+                self._file_chooser_control = ipyleaflet.WidgetControl(
+                    widget=self._file_chooser, position="topright"
+                )
+                self._host_map.add(self._file_chooser_control)
 
         save_btn.on_click(save_btn_click)
+        self._remove_file_chooser = remove_file_chooser
 
         def close_widget(_):
             self.cleanup()
@@ -161,101 +368,160 @@ class SpectralWidget(widgets.HBox):
         output_control = ipyleaflet.WidgetControl(widget=output, position="bottomright")
         self._output_widget = output
         self._output_control = output_control
-        self._host_map.add(output_control)
 
-        if not hasattr(self._host_map, "_spectral_data"):
-            self._host_map._spectral_data = {}
+        @output.capture(clear_output=True, wait=True)
+        def show_figure():
+            # Replace any stale output in a single frontend update.
+            display(self._fig)
 
-        def handle_interaction(**kwargs):
+        def update_spectrum(lat, lon, extract, wavelengths, stack, marker, generation):
+            da = extract(lat, lon)
+            values = da.values
+            values = np.where(values < 0, np.nan, values)
+
+            # Spectra are added from the worker thread; keep the spectral data
+            # and the lines consistent with the kernel thread.
+            with self._lock:
+                # The markers were reset or the widget was closed meanwhile.
+                if (
+                    generation != self._generation
+                    or marker not in self._host_map._plot_markers
+                ):
+                    return
+
+                self._host_map._add_spectral_data(lat, lon, values, wavelengths)
+
+                x = wavelengths
+                y = values
+                colors = [self._line_color]
+                if stack:
+                    color = "#{:02x}{:02x}{:02x}".format(*np.random.randint(0, 256, 3))
+                    colors = [color]
+                    prev_x = np.atleast_2d(self._lines.x)
+                    # Stack onto the existing lines, one row per spectrum.
+                    if self._lines.x.size and prev_x.shape[1] == len(wavelengths):
+                        x = np.vstack([prev_x, wavelengths])
+                        y = np.vstack([np.atleast_2d(self._lines.y), values])
+                        colors = list(self._lines.colors) + colors
+
+                with self._lines.hold_sync():
+                    self._lines.x = x
+                    self._lines.y = y
+                    self._lines.colors = colors
+
+        def report_failure(future, marker):
+            # Runs on the worker thread once the spectrum extraction is done.
+            with self._lock:
+                self._futures.discard(future)
+            if future.cancelled():
+                return
+
+            error = future.exception()
+            if error is None:
+                return
+
+            with self._lock:
+                markers = self._host_map._plot_markers
+                if marker in markers:
+                    markers.remove(marker)
+                    with self._host_map._plot_marker_cluster.hold_sync():
+                        self._host_map._plot_marker_cluster.markers = tuple(markers)
+
+            if self._output_widget is not None:
+                self._output_widget.append_stderr(
+                    "".join(
+                        traceback.format_exception(
+                            type(error), error, error.__traceback__
+                        )
+                    )
+                )
+
+        def handle_click(latlon, click_id=None):
+            # A newer click arrived within the debounce delay; drop this one.
+            if click_id is not None and click_id != self._click_id:
+                return
+
+            if self._closed:
+                return
+
+            extract = self._active_click_fn
+            if extract is None:
+                return
+            wavelengths = self._active_wavelengths
 
-            latlon = kwargs.get("coordinates")
             lat = latlon[0]
             lon = latlon[1]
-            if kwargs.get("type") == "click" and self._host_map._layer_editor is None:
-                layer_name = layers_widget.value
 
-                if not hasattr(self._host_map, "_plot_markers"):
-                    self._host_map._plot_markers = []
+            spectra = self._host_map._spectra
+            if spectra is not None and len(wavelengths) != spectra.shape[1]:
+                self._output_widget.append_stderr(
+                    f"The selected layer has {len(wavelengths)} bands, but the "
+                    f"existing spectral data has {spectra.shape[1]} bands. "
+                    "Remove all markers first.\n"
+                )
+                return
+
+            stack = stack_btn.value
+            marker = ipyleaflet.Marker(location=latlon, draggable=False)
+            with self._lock:
                 markers = self._host_map._plot_markers
                 marker_cluster = self._host_map._plot_marker_cluster
-                markers.append(ipyleaflet.Marker(location=latlon, draggable=False))
-                marker_cluster.markers = markers
-                self._host_map._plot_marker_cluster = marker_cluster
-
-                ds = self._host_map.cog_layer_dict[layer_name]["xds"]
-                if self._host_map.cog_layer_dict[layer_name]["hyper"] == "EMIT":
-                    da = ds.sel(latitude=lat, longitude=lon, method="nearest")[
-                        "reflectance"
-                    ]
-
-                    if "wavelength" not in self._host_map._spectral_data:
-                        self._host_map._spectral_data["wavelength"] = ds[
-                            "wavelength"
-                        ].values
-                elif self._host_map.cog_layer_dict[layer_name]["hyper"] == "PACE":
-                    try:
-                        da = extract_pace(ds, lat, lon)
-                    except:
-                        da = xr.DataArray(
-                            np.full(len(ds["wavelength"]), np.nan),
-                            dims=["wavelength"],
-                            coords={"wavelength": ds["wavelength"]},
-                        )
-                    if "wavelengths" not in self._host_map._spectral_data:
-                        self._host_map._spectral_data["wavelengths"] = ds[
-                            "wavelength"
-                        ].values
-
-                elif self._host_map.cog_layer_dict[layer_name]["hyper"] == "DESIS":
-                    da = extract_desis(ds, lat, lon)
-
-                elif self._host_map.cog_layer_dict[layer_name]["hyper"] == "NEON":
-                    da = extract_neon(ds, lat, lon)
-
-                elif self._host_map.cog_layer_dict[layer_name]["hyper"] == "AVIRIS":
-                    da = extract_aviris(ds, lat, lon)
-
-                self._host_map._spectral_data[f"({lat:.4f} {lon:.4f})"] = da.values
-
-                da[da < 0] = np.nan
-                axes_options = {
-                    "x": {"label_offset": "30px"},
-                    "y": {"label_offset": "35px"},
-                }
-
-                if not stack_btn.value:
-                    plt.clear()
-                    plt.plot(
-                        da.coords[da.dims[0]].values,
-                        da.values,
-                        axes_options=axes_options,
-                    )
-                else:
-                    color = np.random.rand(
-                        3,
-                    )
-                    plt.plot(
-                        da.coords[da.dims[0]].values,
-                        da.values,
-                        color=color,
-                        axes_options=axes_options,
-                    )
-                    try:
-                        if isinstance(self._fig.axes[0], bqplot.ColorAxis):
-                            self._fig.axes = self._fig.axes[1:]
-                        elif isinstance(self._fig.axes[-1], bqplot.ColorAxis):
-                            self._fig.axes = self._fig.axes[:-1]
-                    except:
-                        pass
-                plt.xlabel("Wavelength (nm)")
-                plt.ylabel("Reflectance")
-
-                if not self._show_plot:
-                    with self._output_widget:
-                        plt.show()
-                        self._show_plot = True
-
-                self._host_map.default_style = {"cursor": "crosshair"}
+                markers.append(marker)
+                with marker_cluster.hold_sync():
+                    marker_cluster.markers = tuple(markers)
+
+                if not stack:
+                    # Blank the line while the spectrum is being extracted.
+                    with self._lines.hold_sync():
+                        self._lines.x = wavelengths
+                        self._lines.y = np.full(len(wavelengths), np.nan)
+
+            if not self._show_plot:
+                show_figure()
+                self._show_plot = True
+
+            self._host_map.default_style = {"cursor": "crosshair"}
+
+            future = self._executor.submit(
+                update_spectrum,
+                lat,
+                lon,
+                extract,
+                wavelengths,
+                stack,
+                marker,
+                self._generation,
+            )
+            with self._lock:
+                self._futures.add(future)
+            future.add_done_callback(functools.partial(report_failure, marker=marker))
+
+        def deferred_click(latlon, click_id):
+            # Runs as an event loop callback, where errors would only reach the
+            # asyncio logger; show them in the output widget instead.
+            try:
+                handle_click(latlon, click_id)
+            except Exception:
+                if self._output_widget is not None:
+                    self._output_widget.append_stderr(traceback.format_exc())
+
+        def handle_interaction(**kwargs):
+            if (
+                kwargs.get("type") != "click"
+                or self._host_map._layer_editor is not None
+            ):
+                return
+
+            latlon = kwargs.get("coordinates")
+            self._click_id += 1
+            try:
+                loop = asyncio.get_running_loop()
+            except RuntimeError:
+                handle_click(latlon)
+            else:
+                self._click_timer = loop.call_later(
+                    self._click_delay, deferred_click, latlon, self._click_id
+                )
 
         self._host_map.on_interaction(handle_interaction)
         self._on_map_interaction = handle_interaction
@@ -264,35 +530,202 @@ class SpectralWidget(widgets.HBox):
         self._spectral_control = ipyleaflet.WidgetControl(
             widget=self, position=position
         )
-        self._host_map.add(self._spectral_control)
 
-    def cleanup(self):
-        """Removes the widget from the map and performs cleanup."""
-        if self._host_map:
-            self._host_map.default_style = {"cursor": "default"}
-            self._host_map.on_interaction(self._on_map_interaction, remove=True)
+        # Add both controls in a single update of the map controls.
+        self._host_map.controls = self._host_map.controls + (
+            output_control,
+            self._spectral_control,
+        )
 
-            if self._output_control:
-                self._host_map.remove_control(self._output_control)
+    def _on_layer_change(self, change):
+        """
+        Prepares the selected layer for spectral extraction.
 
-                if self._output_widget:
-                    self._output_widget.close()
-                    self._output_widget = None
+        Args:
+            change (dict): The change notification of the layer dropdown.
+        """
+        layer_name = change["new"]
+        layer_dict = self._host_map.cog_layer_dict.get(layer_name, {})
+        if "xds" not in layer_dict:
+            self._active_click_fn = None
+            self._active_wavelengths = None
+            return
+
+        ds = layer_dict["xds"]
+        cache = self._layer_cache.setdefault(layer_name, {})
+        if "wavelength_axis" not in cache:
+            cache["wavelength_axis"] = ds["wavelength"].values
+        wavelengths = cache["wavelength_axis"]
+        with self._x_scale.hold_sync():
+            self._x_scale.min = float(np.nanmin(wavelengths))
+            self._x_scale.max = float(np.nanmax(wavelengths))
+
+        if layer_dict.get("hyper") == "EMIT" and "grid_dims" not in cache:
+            axes = _build_latlon_axes(ds)
+            if axes is not None:
+                cache["latlon_axes"] = axes
+                cache["grid_dims"] = (
+                    ds["latitude"].dims[0],
+                    ds["longitude"].dims[0],
+                )
+            else:
+                tree, dims, lat_grid, _ = _build_latlon_tree(ds)
+                cache["tree"] = tree
+                cache["grid_dims"] = dims
+                cache["grid_shape"] = lat_grid.shape
+            cache["read_pixel"] = _build_pixel_reader(
+                ds["reflectance"], cache["grid_dims"]
+            )
 
-            if self._spectral_control:
-                self._host_map.remove_control(self._spectral_control)
-                self._spectral_control = None
+        elif layer_dict.get("hyper") == "PACE" and "tree" not in cache:
+            tree, dims, lat_grid, lon_grid = _build_latlon_tree(ds)
+            cache["tree"] = tree
+            cache["grid_dims"] = dims
+            cache["grid_shape"] = lat_grid.shape
+            cache["latlon_grid"] = (lat_grid.ravel(), lon_grid.ravel())
 
-                if self._spectral_widget:
-                    self._spectral_widget.close()
-                    self._spectral_widget = None
+        self._active_click_fn = self._compile_click_handler(layer_name)
+        self._active_wavelengths = wavelengths
 
-            if hasattr(self._host_map, "_plot_marker_cluster"):
-                self._host_map._plot_marker_cluster.markers = []
-                self._host_map._plot_markers = []
+    def _compile_click_handler(self, layer_name):
+        """
+        Builds a function that extracts the spectrum at a location of a layer.
+
+        The data type of the layer and its lookup structures are resolved here
+        once, so the returned function does no per-click dispatch.
+
+        Args:
+            layer_name (str): The name of the layer.
+
+        Returns:
+            function: A function that takes a latitude and a longitude and
+                returns the spectrum as an xarray.DataArray, or None if the
+                data type of the layer is not supported.
+        """
+        layer_dict = self._host_map.cog_layer_dict[layer_name]
+        cache = self._layer_cache[layer_name]
+        ds = layer_dict["xds"]
+        hyper = layer_dict.get("hyper")
+
+        if hyper == "EMIT":
+            read_pixel = cache["read_pixel"]
+            if "latlon_axes" in cache:
+                (lat_axis, lat_desc), (lon_axis, lon_desc) = cache["latlon_axes"]
+
+                def extract(lat, lon):
+                    i = _nearest_index(lat_axis, lat, lat_desc)
+                    j = _nearest_index(lon_axis, lon, lon_desc)
+                    return read_pixel(i, j)
+
+            else:
+                tree = cache["tree"]
+                shape = cache["grid_shape"]
+
+                def extract(lat, lon):
+                    _, index = tree.query(_latlon_to_xyz(lat, lon)[0])
+                    i, j = np.unravel_index(index, shape)
+                    return read_pixel(int(i), int(j))
+
+        elif hyper == "PACE":
+            tree = cache["tree"]
+            shape = cache["grid_shape"]
+            lat_grid, lon_grid = cache["latlon_grid"]
+            y_dim, x_dim = cache["grid_dims"]
+            rrs = ds["Rrs"]
+            empty = xr.DataArray(
+                np.full(len(ds["wavelength"]), np.nan),
+                dims=["wavelength"],
+                coords={"wavelength": ds["wavelength"]},
+            )
+            # Same box as extract_pace. A cell in the box is at most 2 * delta
+            # degrees away, so the ball of that radius holds the whole box.
+            delta = 0.01
+            radius = 2 * np.sin(np.deg2rad(2 * delta) / 2)
+
+            def extract(lat, lon):
+                index = np.asarray(
+                    tree.query_ball_point(_latlon_to_xyz(lat, lon)[0], radius),
+                    dtype=int,
+                )
+                in_box = (np.abs(lat_grid[index] - lat) < delta) & (
+                    np.abs(lon_grid[index] - lon) < delta
+                )
+                if not in_box.any():
+                    return empty
+                i, j = np.unravel_index(index[in_box], shape)
+                pixels = rrs.isel(
+                    {
+                        y_dim: xr.DataArray(i, dims="pixel"),
+                        x_dim: xr.DataArray(j, dims="pixel"),
+                    }
+                )
+                return pixels.mean(dim="pixel")
+
+        elif hyper == "DESIS":
+            extract = functools.partial(extract_desis, ds)
+        elif hyper == "NEON":
+            extract = functools.partial(extract_neon, ds)
+        elif hyper == "AVIRIS":
+            extract = functools.partial(extract_aviris, ds)
+        else:
+            extract = None
+
+        return extract
 
-            if hasattr(self._host_map, "_spectral_data"):
-                self._host_map._spectral_data = {}
+    def cleanup(self):
+        """Removes the widget from the map and performs cleanup."""
+        self._closed = True
+        if self._click_timer is not None:
+            self._click_timer.cancel()
+            self._click_timer = None
+        with self._lock:
+            self._generation += 1
+            futures = list(self._futures)
+        # shutdown(cancel_futures=True) requires Python 3.9.
+        for future in futures:
+            future.cancel()
+        self._executor.shutdown(wait=False)
+        self._active_click_fn = None
+        for cache in self._layer_cache.values():
+            if "read_pixel" in cache and hasattr(cache["read_pixel"], "cache_clear"):
+                cache["read_pixel"].cache_clear()
+        self._layer_cache.clear()
+        if self._host_map:
+            self._host_map.default_style = {"cursor": "default"}
+            self._host_map.on_interaction(self._on_map_interaction, remove=True)
+
+            # Remove both controls in a single update of the map controls.
+            controls = [
+                control
+                for control in (self._output_control, self._spectral_control)
+                if control is not None
+            ]
+            self._host_map.controls = tuple(
+                control
+                for control in self._host_map.controls
+                if control not in controls
+            )
+            for control in controls:
+                control.close()
+            self._output_control = None
+            self._spectral_control = None
+
+            if self._output_widget:
+                self._output_widget.close()
+                self._output_widget = None
+
+            if self._spectral_widget:
+                self._spectral_widget.close()
+                self._spectral_widget = None
+
+            self._remove_file_chooser()
+            if self._file_chooser is not None:
+                self._file_chooser.close()
+                self._file_chooser = None
+
+            self._host_map._plot_marker_cluster.markers = []
+            self._host_map._plot_markers = []
+            self._host_map._clear_spectral_data()
 
             if hasattr(self, "_output_widget") and self._output_widget is not None:
                 self._output_widget.clear_output()
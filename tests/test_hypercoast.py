@@ -5,6 +5,8 @@
 
 import unittest
 
+import numpy as np
+
 from hypercoast import hypercoast
 
 
@@ -19,3 +21,36 @@ class TestHypercoast(unittest.TestCase):
 
     def test_000_something(self):
         """Test something."""
+
+    def test_add_spectral_data_grows_capacity(self):
+        """Test that the spectral data keeps all spectra past the initial capacity."""
+        m = hypercoast.Map()
+        m._clear_spectral_data()
+        wavelengths = np.linspace(400, 2500, 5)
+        for k in range(17):
+            m._add_spectral_data(k, -k, np.full(5, k / 100), wavelengths)
+
+        self.assertEqual(m._spectra_count, 17)
+        self.assertEqual(m._spectra.shape, (32, 5))
+        self.assertEqual(m._spectra.dtype, np.float16)
+        np.testing.assert_array_equal(m._spectra_coords[16], [16, -16])
+        np.testing.assert_array_equal(m._spectral_wavelengths, wavelengths)
+
+        df = m.spectral_to_df()
+        self.assertEqual(df.shape, (5, 18))
+        self.assertEqual(df.columns[-1], "(16.0000 -16.0000)")
+        np.testing.assert_array_equal(df.iloc[:, -1], 0.16)
+
+    def test_add_spectral_data_rejects_band_mismatch(self):
+        """Test that a spectrum with a different number of bands is rejected."""
+        m = hypercoast.Map()
+        m._clear_spectral_data()
+        m._add_spectral_data(0, 0, np.zeros(5), np.arange(5))
+
+        with self.assertRaises(ValueError):
+            m._add_spectral_data(1, 1, np.zeros(4), np.arange(4))
+        self.assertEqual(m._spectra_count, 1)
+
+        m._clear_spectral_data()
+        m._add_spectral_data(1, 1, np.zeros(4), np.arange(4))
+        self.assertEqual(m._spectra.shape[1], 4)
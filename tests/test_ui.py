@@ -0,0 +1,111 @@
+#!/usr/bin/env python
+
+"""Tests for the helpers of `hypercoast.ui`."""
+
+
+import unittest
+
+import numpy as np
+import xarray as xr
+
+from hypercoast import ui
+
+try:
+    import dask  # noqa: F401
+
+    HAS_DASK = True
+except ImportError:
+    HAS_DASK = False
+
+
+def _make_dataset(lat, lon, nbands=3):
+    values = np.arange(len(lat) * len(lon) * nbands, dtype=np.float32)
+    return xr.Dataset(
+        {
+            "reflectance": (
+                ("latitude", "longitude", "wavelength"),
+                values.reshape(len(lat), len(lon), nbands),
+            )
+        },
+        coords={
+            "latitude": lat,
+            "longitude": lon,
+            "wavelength": np.arange(nbands),
+        },
+    )
+
+
+class TestNearestIndex(unittest.TestCase):
+    """Tests for `_nearest_index` and `_build_latlon_axes`."""
+
+    def test_nearest_index(self):
+        """Test the lookup against argmin on an ascending axis."""
+        axis = np.array([0.0, 1.0, 2.5, 4.0], dtype=np.float32)
+        for value in [-1.0, 0.4, 0.6, 1.7, 1.8, 3.9, 10.0]:
+            self.assertEqual(
+                ui._nearest_index(axis, value), np.abs(axis - value).argmin()
+            )
+
+    def test_descending_axis(self):
+        """Test that indices of a descending axis map back to the original order."""
+        lat = np.linspace(40, 39, 11)
+        lon = np.linspace(-80, -79, 6)
+        axes = ui._build_latlon_axes(_make_dataset(lat, lon))
+        (lat_axis, lat_desc), (lon_axis, lon_desc) = axes
+
+        self.assertTrue(lat_desc)
+        self.assertFalse(lon_desc)
+        self.assertEqual(lat_axis.dtype, np.float32)
+        self.assertTrue(np.all(np.diff(lat_axis) > 0))
+        for value in [40.5, 39.96, 39.54, 38.0]:
+            i = ui._nearest_index(lat_axis, value, lat_desc)
+            self.assertEqual(i, np.abs(lat - value).argmin())
+
+    def test_length_one_axis(self):
+        """Test that a single-pixel axis always returns index 0."""
+        axes = ui._build_latlon_axes(_make_dataset([39.5], [-79.5]))
+        for axis, descending in axes:
+            self.assertEqual(len(axis), 1)
+            for value in [-90.0, 39.5, 90.0]:
+                self.assertEqual(ui._nearest_index(axis, value, descending), 0)
+
+    def test_non_monotonic_axis(self):
+        """Test that non-monotonic coordinates are left to the k-d tree."""
+        ds = _make_dataset([39.0, 39.5, 39.2], [-80.0, -79.0])
+        self.assertIsNone(ui._build_latlon_axes(ds))
+
+
+class TestPixelReader(unittest.TestCase):
+    """Tests for `_build_pixel_reader`."""
+
+    def setUp(self):
+        """Set up test fixtures, if any."""
+        self.ds = _make_dataset(np.linspace(40, 39, 10), np.linspace(-80, -79, 7))
+        self.dims = ("latitude", "longitude")
+
+    def test_numpy_array(self):
+        """Test reading pixels from an in-memory array."""
+        da = self.ds["reflectance"]
+        read_pixel = ui._build_pixel_reader(da, self.dims)
+        np.testing.assert_array_equal(read_pixel(3, 5), da.values[3, 5])
+
+    @unittest.skipUnless(HAS_DASK, "dask is not installed")
+    def test_dask_chunk_boundaries(self):
+        """Test that pixels are read from the dask chunk that contains them."""
+        da = self.ds["reflectance"]
+        chunked = da.chunk({"latitude": (3, 4, 3), "longitude": (2, 5)})
+        read_pixel = ui._build_pixel_reader(chunked, self.dims)
+
+        for i in range(da.shape[0]):
+            for j in range(da.shape[1]):
+                np.testing.assert_array_equal(read_pixel(i, j), da.values[i, j])
+
+        # Each chunk is loaded once, then served from the cache.
+        read_pixel.cache_clear()
+        read_pixel(3, 2)
+        read_pixel(6, 6)
+        self.assertIsNone(read_pixel(4, 3).chunks)
+
+
+if __name__ == "__main__":
+    unittest.main()